@@ -1,15 +1,138 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import joblib
+import functools
+import gc
+import json
 import os
 from datetime import datetime
 from pathlib import Path # Used for robust path handling
 
+import forest  # inference-only scorer for the exported tree arrays
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; plain Python keeps the app working
+    def njit(*args, **kwargs):
+        def wrap(fn):
+            return fn
+        return wrap
+
 # --- Configuration ---
-# Use pathlib for robust path handling
-MODEL_PATH = Path(__file__).resolve().parent.parent / 'models' / 'crime_predictor_model.joblib'
-MODEL_PATH_STR = str(MODEL_PATH)
+
+@functools.cache
+def _model_path():
+    """Resolve the joblib model path once per process.
+
+    Path(...).resolve() walks symlinks with realpath syscalls and Streamlit
+    reruns the whole script on every interaction, so the result is frozen
+    here; CRIME_MODEL_PATH overrides it for deployments.
+    """
+    return os.environ.get('CRIME_MODEL_PATH') or str(
+        Path(__file__).resolve().parent.parent / 'models' / 'crime_predictor_model.joblib'
+    )
+
+
+@functools.cache
+def _onnx_path():
+    """Compiled copy produced by scripts/export_onnx.py (preferred when present)."""
+    return str(Path(_model_path()).with_suffix('.onnx'))
+
+
+@functools.cache
+def _forest_path():
+    """Raw node arrays produced by scripts/export_forest.py."""
+    return str(Path(_model_path()).parent / 'forest.npz')
+
+# The EXACT column order the model was trained on
+# (7 continuous + 2 victim_gender + 6 weapon_used + 1 case_closed = 16 features).
+FEATURE_ORDER = (
+    'victim_age',
+    'police_deployed',
+    'latitude',
+    'longitude',
+    'report_hour',
+    'report_day_of_week',
+    'report_month',
+    'victim_gender_M',
+    'victim_gender_X',
+    'weapon_used_Explosives',
+    'weapon_used_Firearm',
+    'weapon_used_Knife',
+    'weapon_used_Other',
+    'weapon_used_Poison',
+    'weapon_used_Unknown',
+    'case_closed_Yes'
+)
+N_FEATURES = len(FEATURE_ORDER)
+
+# Small integer codes for the categorical selectboxes; 0 marks the baseline
+# categories the training dummies dropped ('Female'/'Other' gender,
+# 'Blunt Object'/'None' weapon). The codes index into the one-hot columns
+# inside the fused _encode kernel below.
+GENDER_CODE = {'Female': 0, 'Other': 0, 'Male': 1, 'X': 2}
+WEAPON_CODE = {
+    'Blunt Object': 0,
+    'None': 0,
+    'Explosives': 1,
+    'Firearm': 2,
+    'Knife': 3,
+    'Other': 4,
+    'Poison': 5,
+    'Unknown': 6,
+}
+# Risk bucket edges in integer basis points of probability: scores in
+# [0%, 40%) are LOW, [40%, 70%) MODERATE, [70%, 100%] HIGH. A single
+# searchsorted against the edges replaces the if/elif ladder.
+_RISK_BUCKETS = np.array([4000, 7000])
+_RISK_LABELS = (
+    ('LOW RISK', '#32cd32'),
+    ('MODERATE RISK', '#ffc300'),
+    ('HIGH RISK', '#ff4d4d'),
+)
+
+# Result card rendered after each prediction; built once and filled with
+# str.format instead of re-interpolating a multi-line f-string per click.
+_RESULT_TEMPLATE = """
+    <div style="padding: 20px; border-radius: 10px; background-color: {color}1a; border: 2px solid {color};">
+        <p style="font-size: 1.2em; color: {color}; text-align: center;">
+            Probability of **Violent Crime**:
+        </p>
+        <p style="font-size: 3em; font-weight: bold; color: {color}; text-align: center; margin: 0;">
+            {score}%
+        </p>
+        <p style="font-size: 1.5em; font-weight: bold; color: {color}; text-align: center;">
+            Overall Risk: {risk}
+        </p>
+    </div>
+"""
+
+@njit(cache=True)
+def _encode(out, age, police, lat, lon, hour, dow, month, case_yes,
+            gender_code, weapon_code):
+    """Fill the (1, 16) float32 feature row ``out`` in one fused, typed kernel.
+
+    Under numba this compiles to a straight-line float32 fill with no
+    per-assignment interpreter overhead; without numba it runs as-is.
+    Writes in place so callers can reuse one buffer across clicks.
+    Column positions follow FEATURE_ORDER exactly.
+    """
+    out[0, :] = 0.0
+    out[0, 0] = age
+    out[0, 1] = police
+    out[0, 2] = lat
+    out[0, 3] = lon
+    out[0, 4] = hour
+    out[0, 5] = dow
+    out[0, 6] = month
+    if gender_code > 0:
+        out[0, 6 + gender_code] = 1.0   # victim_gender_M / victim_gender_X
+    if weapon_code > 0:
+        out[0, 8 + weapon_code] = 1.0   # weapon_used_* dummies
+    out[0, 15] = case_yes
+
+
+# Trigger the (disk-cached) numba compile at import instead of first click.
+_encode(np.empty((1, N_FEATURES), dtype=np.float32), 0, 0, 0.0, 0.0, 0, 0, 0, 0, 0, 0)
 
 # Set Streamlit page configuration
 st.set_page_config(
@@ -18,13 +141,54 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_resource
+@st.cache_resource(max_entries=1)
+def load_onnx_session(path):
+    """Load the compiled ONNX copy of the forest, if one has been exported.
+
+    onnxruntime traverses the ensemble in compiled C with no per-tree Python
+    dispatch, which cuts single-row latency substantially versus sklearn.
+    Returns None when the .onnx file or onnxruntime itself is unavailable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        import onnxruntime as ort
+        return ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+    except Exception as e:
+        st.warning(f"Compiled model could not be loaded ({e}); falling back to the joblib model.")
+        return None
+
+
+@st.cache_resource(max_entries=1)
+def load_forest_arrays(path):
+    """Load the raw tree arrays exported by scripts/export_forest.py.
+
+    These let app/forest.py serve predictions without importing sklearn or
+    joblib at all. Returns None when the export has not been run.
+    """
+    if not os.path.exists(path):
+        return None
+    return forest.load_forest(path)
+
+
+@st.cache_resource(max_entries=1)
 def load_model(path):
-    """Load the trained model from the joblib file."""
+    """Load the trained model from the joblib file.
+
+    mmap_mode='r' maps the large tree arrays read-only instead of copying
+    them into each worker's private heap, so the kernel page cache shares
+    them across workers and can reclaim them under memory pressure.
+    Downstream code must therefore never mutate the tree arrays in place.
+
+    joblib is imported here, not at module top, so ONNX deployments and
+    plain reruns never pay its import cost.
+    """
+    import joblib
+    # The try guards only the load itself: st.stop() raises a StopException
+    # that subclasses Exception, so any post-load step calling it from inside
+    # this block would be swallowed by the generic handler below.
     try:
-        model = joblib.load(path) 
-        st.success("Model loaded successfully!")
-        return model
+        model = joblib.load(path, mmap_mode='r')
     except FileNotFoundError:
         st.error(f"Error: Model file not found at {path}. Please ensure the path and file name are correct and that you ran Notebook 2.")
         st.stop()
@@ -32,11 +196,187 @@ def load_model(path):
         st.error(f"Error loading model: {e}")
         st.stop()
 
-# Load the model globally
-model = load_model(MODEL_PATH_STR) 
+    # Optional serve-time speed/accuracy tradeoff: inference scales
+    # linearly with the number of trees, so SERVE_TREES=<K> keeps only
+    # the first K estimators of the ensemble.
+    if hasattr(model, 'estimators_'):
+        k = int(os.environ.get('SERVE_TREES', len(model.estimators_)))
+        if 0 < k < len(model.estimators_):
+            model.estimators_ = model.estimators_[:k]
+            model.n_estimators = k
+        st.sidebar.caption(f"Serving with {len(model.estimators_)} trees.")
+        # The model was persisted with its training n_jobs; predict-time
+        # tree traversal releases the GIL, so let the forest fan out its
+        # per-tree work across all cores (matters for the batch path).
+        model.n_jobs = -1
+    # FEATURE_ORDER stands in for sklearn's per-call feature-name check,
+    # so verify it once against the order persisted at training time.
+    order_file = Path(path).parent / 'feature_order.json'
+    if order_file.exists():
+        saved_order = json.loads(order_file.read_text())
+        if list(FEATURE_ORDER) != saved_order:
+            st.error("FEATURE_ORDER no longer matches models/feature_order.json. Update the app's feature list to the training order.")
+            st.stop()
+    # With feature_names_in_ gone, predict takes the fast ndarray path
+    # and skips the per-call name validation entirely.
+    if hasattr(model, 'feature_names_in_'):
+        del model.feature_names_in_
+    st.success("Model loaded successfully!")
+    return model
+
+# Load the model globally. Preference order: compiled ONNX copy, exported
+# raw tree arrays, then the full sklearn model as the fallback — the joblib
+# file is only touched (and sklearn only imported) when neither export exists.
+# The npz forest only beats sklearn when numba compiles its traversal, so
+# without numba the exported arrays are ignored rather than served through
+# the pure-Python fallback loop.
+onnx_session = load_onnx_session(_onnx_path())
+forest_arrays = (load_forest_arrays(_forest_path())
+                 if onnx_session is None and forest.HAVE_NUMBA else None)
+model = (load_model(_model_path())
+         if onnx_session is None and forest_arrays is None else None)
+
+
+# The last 9 columns of FEATURE_ORDER are binary dummies, so they define at
+# most 2^9 = 512 distinct branch contexts per tree. SPECIALIZED_PREDICT=1
+# partially evaluates every tree against those columns so a click only
+# traverses the surviving continuous splits. Experimental; the full model
+# remains the default and the batch path never uses it.
+_SPECIALIZE = os.environ.get('SPECIALIZED_PREDICT', '0') == '1'
+_N_BINARY = 9  # columns 7..15
+_BINARY_START = 7
+
+
+def _specialize_tree(tree, mask):
+    """Partially evaluate one tree against the binary dummy columns.
+
+    ``mask`` bit (i - 7) holds the value of feature column i. Returns flat
+    (feature, threshold, left, right, leaf_proba) arrays containing only the
+    continuous splits that survive once the dummies are fixed; leaf_proba is
+    the violent-crime probability at each remaining leaf.
+    """
+    feat = tree.feature
+    thr = tree.threshold
+    left = tree.children_left
+    right = tree.children_right
+    value = tree.value
+
+    out_feat, out_thr, out_left, out_right, out_proba = [], [], [], [], []
+
+    def build(node):
+        f = feat[node]
+        # Splits on dummy columns are fully determined by the mask; skip
+        # straight to the surviving child.
+        while f >= _BINARY_START:
+            bit = (mask >> (f - _BINARY_START)) & 1
+            node = left[node] if bit <= thr[node] else right[node]
+            f = feat[node]
+        idx = len(out_feat)
+        out_feat.append(f)
+        out_thr.append(thr[node])
+        out_left.append(-1)
+        out_right.append(-1)
+        if f < 0:  # leaf
+            counts = value[node][0]
+            out_proba.append(float(counts[1] / counts.sum()))
+        else:
+            out_proba.append(0.0)
+            out_left[idx] = build(left[node])
+            out_right[idx] = build(right[node])
+        return idx
+
+    build(0)
+    return (np.asarray(out_feat, dtype=np.int64),
+            np.asarray(out_thr, dtype=np.float64),
+            np.asarray(out_left, dtype=np.int64),
+            np.asarray(out_right, dtype=np.int64),
+            np.asarray(out_proba, dtype=np.float64))
+
+
+@st.cache_resource(max_entries=512)
+def _specialized_forest(mask):
+    """Pruned copies of every tree for one setting of the dummy columns."""
+    return tuple(_specialize_tree(est.tree_, mask) for est in model.estimators_)
+
+
+def _predict_specialized(x):
+    """Score a single row using the mask-specialized forest."""
+    mask = 0
+    for i in range(_BINARY_START, _BINARY_START + _N_BINARY):
+        mask |= int(x[0, i] > 0.5) << (i - _BINARY_START)
+    total = 0.0
+    trees = _specialized_forest(mask)
+    for feat, thr, left, right, proba in trees:
+        node = 0
+        while feat[node] >= 0:
+            node = left[node] if x[0, feat[node]] <= thr[node] else right[node]
+        total += proba[node]
+    return total / len(trees)
+
+
+def _predict(x):
+    """Score a (N, 16) float32 array and return the violent-crime probabilities.
+
+    Shared by the single-row Predict button and the batch CSV path so both
+    pay the model dispatch cost once per call, however many rows x holds.
+    """
+    # Both backends consume float32 (sklearn's forest casts internally,
+    # onnxruntime requires it); narrowing here makes that cast a no-op for
+    # callers that already filled a float32 buffer.
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    if onnx_session is not None:
+        # Output 0 is the label, output 1 the (N, 2) probability tensor.
+        return onnx_session.run(None, {'input': x})[1][:, 1]
+    if forest_arrays is not None:
+        return forest.predict_proba(*forest_arrays, x)
+    if _SPECIALIZE and x.shape[0] == 1:
+        return np.array([_predict_specialized(x)])
+    # load_model stripped feature_names_in_, so the raw ndarray goes straight
+    # through without sklearn's per-call name validation.
+    return model.predict_proba(x)[:, 1]
+
+
+@st.cache_data(max_entries=512, ttl=24 * 60 * 60)
+def predict_risk(victim_age, police_deployed, latitude, longitude,
+                 report_hour, report_day_of_week, report_month,
+                 victim_gender, weapon_used, case_closed_yes):
+    """Encode one set of widget values and return the violent-crime probability.
+
+    Memoized on the raw inputs so repeated clicks (or reruns that leave the
+    features unchanged) skip both the encoding and the tree traversal;
+    max_entries/ttl bound the cache's memory footprint.
+    """
+    # Overwrite the session's reusable row in place; one allocation is
+    # amortized over every click because _predict never retains a reference
+    # to its argument.
+    x = st.session_state.x_buf
+    _encode(x, victim_age, police_deployed, latitude, longitude,
+            report_hour, report_day_of_week, report_month, case_closed_yes,
+            GENDER_CODE[victim_gender], WEAPON_CODE[weapon_used])
+    return float(_predict(x)[0])
+
+# --- Sidebar: model management ---
+# max_entries=1 on the loaders keeps exactly one model resident per worker;
+# the explicit reload clears every model-derived cache — the loaders, the
+# pruned trees held by _specialized_forest and the probabilities memoized by
+# predict_risk — and collects so the evicted tree arrays' pages are released
+# promptly rather than lingering until the next GC pass.
+if st.sidebar.button('Reload model'):
+    load_onnx_session.clear()
+    load_forest_arrays.clear()
+    load_model.clear()
+    _specialized_forest.clear()
+    predict_risk.clear()
+    gc.collect()
+    st.rerun()  # restart so this run's globals pick up the fresh model
 
 # --- Title and Description ---
-st.markdown("""
+
+@st.cache_data
+def _title_html():
+    """Static page header; cached so reruns reuse the stored blob instead of
+    rebuilding and re-serializing it on every widget interaction."""
+    return """
     <div style="background-color:#ffebeb; padding:15px; border-radius:10px; text-align:center;">
         <h1 style="color:#cc0000;">🚨 Violent Crime Risk Predictor 🇮🇳</h1>
         <p style="color:#555555;">
@@ -45,11 +385,24 @@ st.markdown("""
         </p>
     </div>
     <br>
-""", unsafe_allow_html=True)
+"""
+
+
+@st.cache_data
+def _footer_text():
+    """Static footer caption, cached for the same reason as the header."""
+    return ("This application uses a Random Forest Classifier trained on "
+            "sample Indian crime data (Project Version 3).")
+
+
+st.markdown(_title_html(), unsafe_allow_html=True)
 
 # --- Feature Input Sidebars (Aesthetics) ---
 col1, col2 = st.columns([1, 1])
 
+# One clock read per rerun, shared by the date and time widget defaults.
+_now = datetime.now()
+
 # --- Input: Location and Time ---
 with col1:
     st.subheader("Time and Location Context")
@@ -69,12 +422,12 @@ with col1:
     # 2. Time Features
     report_datetime = st.date_input(
         'Date of Incident Report',
-        datetime.now().date(),
+        _now.date(),
         help="Used to derive the month and day of the week."
     )
     report_time = st.time_input(
         'Time of Incident Report',
-        datetime.now().time(),
+        _now.time(),
         help="Used to derive the hour of the day (24-hour format)."
     )
 
@@ -122,105 +475,66 @@ with col2:
 
 # --- Prediction Logic ---
 
-if st.button('Predict Risk', use_container_width=True):
-    
-    # 1. Create a dictionary of all features, ensuring 'weapon_used_Firearm' is now included.
-    data = {
-        # Continuous/Integer features
-        'victim_age': [victim_age],
-        'police_deployed': [police_deployed],
-        'latitude': [latitude],
-        'longitude': [longitude],
-        'report_hour': [report_hour],
-        'report_day_of_week': [report_day_of_week],
-        'report_month': [report_month],
-        'case_closed_Yes': [1 if case_closed == 'Yes' else 0],
-        
-        # --- VICTIM GENDER DUMMIES (M, X were kept) ---
-        'victim_gender_M': [1 if victim_gender == 'Male' else 0],
-        'victim_gender_X': [1 if victim_gender == 'X' else 0], 
-        
-        # --- WEAPON USED DUMMIES (Based on errors, we only include the categories that REMAINED in the model) ---
-        'weapon_used_Firearm': [1 if weapon_used == 'Firearm' else 0], # <-- ADDED: REQUIRED BY ERROR
-        'weapon_used_Explosives': [1 if weapon_used == 'Explosives' else 0],
-        'weapon_used_Knife': [1 if weapon_used == 'Knife' else 0],
-        'weapon_used_Other': [1 if weapon_used == 'Other' else 0],
-        'weapon_used_Poison': [1 if weapon_used == 'Poison' else 0],
-        'weapon_used_Unknown': [1 if weapon_used == 'Unknown' else 0], 
-        
-        # We continue to exclude the 5 features from previous errors:
-        # 'crime_domain_Other Crime', 'crime_domain_Traffic Fatality', 'victim_gender_Other', 
-        # 'weapon_used_Blunt Object', 'weapon_used_None'
-    }
-
-    # 2. Convert to DataFrame
-    input_df = pd.DataFrame(data)
-
-    # 3. Define the EXACT column order for the 16 remaining features (7 continuous + 1 case_closed + 2 victim_gender + 6 weapon_used)
-    expected_columns = [
-        'victim_age', 
-        'police_deployed', 
-        'latitude', 
-        'longitude', 
-        'report_hour',
-        'report_day_of_week', 
-        'report_month', 
-        'victim_gender_M', 
-        'victim_gender_X', 
-        'weapon_used_Explosives', 
-        'weapon_used_Firearm', # <-- ADDED: REQUIRED BY ERROR
-        'weapon_used_Knife',
-        'weapon_used_Other', 
-        'weapon_used_Poison',
-        'weapon_used_Unknown', 
-        'case_closed_Yes'
-    ]
-    
-    try:
-        input_df = input_df[expected_columns]
-    except KeyError as e:
-        st.error(f"FATAL FEATURE MISMATCH: A column name is still missing or incorrect: {e}. The expected features list is wrong.")
-        st.stop()
+# One reusable input row per session, overwritten on every click.
+if 'x_buf' not in st.session_state:
+    st.session_state.x_buf = np.empty((1, N_FEATURES), dtype=np.float32)
 
+if st.button('Predict Risk', use_container_width=True):
 
-    # 4. Make Prediction
+    # 1. Make Prediction (memoized on the raw widget values)
     try:
-        # Get the probability of the positive class (Violent Crime, which is index 1)
-        prediction_proba = model.predict_proba(input_df)[:, 1][0]
-        prediction_score = round(prediction_proba * 100, 2)
-        
-        # 5. Display Result
+        # Get the probability of the positive class (Violent Crime)
+        prediction_proba = predict_risk(
+            victim_age, police_deployed, latitude, longitude,
+            report_hour, report_day_of_week, report_month,
+            victim_gender, weapon_used, 1 if case_closed == 'Yes' else 0
+        )
+        # Integer-scaled score: basis points of probability, rendered with
+        # plain integer division instead of round() on a float.
+        score_bp = int(prediction_proba * 10000 + 0.5)
+        prediction_score = f'{score_bp // 100}.{score_bp % 100:02d}'
+
+        # 2. Display Result
         st.markdown("---")
         st.subheader("Prediction Result")
         
-        # Dynamic Risk Assessment
-        if prediction_score >= 70:
-            risk_level = "HIGH RISK"
-            color = "#ff4d4d"
-        elif prediction_score >= 40:
-            risk_level = "MODERATE RISK"
-            color = "#ffc300"
-        else:
-            risk_level = "LOW RISK"
-            color = "#32cd32"
-            
-        st.markdown(f"""
-            <div style="padding: 20px; border-radius: 10px; background-color: {color}1a; border: 2px solid {color};">
-                <p style="font-size: 1.2em; color: {color}; text-align: center;">
-                    Probability of **Violent Crime**:
-                </p>
-                <p style="font-size: 3em; font-weight: bold; color: {color}; text-align: center; margin: 0;">
-                    {prediction_score}%
-                </p>
-                <p style="font-size: 1.5em; font-weight: bold; color: {color}; text-align: center;">
-                    Overall Risk: {risk_level}
-                </p>
-            </div>
-        """, unsafe_allow_html=True)
+        # Dynamic Risk Assessment (side='right' keeps scores of exactly 40%
+        # and 70% in the higher bucket, matching the old >= comparisons)
+        risk_level, color = _RISK_LABELS[
+            int(np.searchsorted(_RISK_BUCKETS, score_bp, side='right'))
+        ]
+
+
+        st.markdown(
+            _RESULT_TEMPLATE.format(color=color, score=prediction_score, risk=risk_level),
+            unsafe_allow_html=True
+        )
         
     except Exception as e:
         st.error(f"An error occurred during prediction: {e}")
 
+# --- Batch Scoring ---
+st.markdown("---")
+st.subheader("Batch Scoring (CSV Upload)")
+uploaded = st.file_uploader(
+    'Upload a CSV with the 16 model feature columns to score all rows in one call',
+    type='csv',
+    help=f"Required columns: {', '.join(FEATURE_ORDER)}"
+)
+if uploaded is not None:
+    import pandas as pd
+    try:
+        # Read straight into float32 so the whole file becomes one (N, 16)
+        # array and the forest is invoked exactly once for all rows.
+        batch_df = pd.read_csv(
+            uploaded, usecols=list(FEATURE_ORDER),
+            dtype={col: np.float32 for col in FEATURE_ORDER}
+        )[list(FEATURE_ORDER)]
+        batch_proba = _predict(batch_df.to_numpy())
+        st.dataframe(pd.DataFrame({'risk_%': (batch_proba * 100).round(2)}))
+    except Exception as e:
+        st.error(f"Could not score the uploaded file: {e}")
+
 # --- Footer/About ---
 st.markdown("---")
-st.caption("This application uses a Random Forest Classifier trained on sample Indian crime data (Project Version 3).")
+st.caption(_footer_text())
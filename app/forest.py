@@ -0,0 +1,59 @@
+"""Inference-only scorer for the exported Random Forest.
+
+scripts/export_forest.py dumps every tree's raw node arrays (feature,
+threshold, children, leaf probabilities) into a single .npz file; this module
+walks those arrays directly, so serving needs neither sklearn nor joblib and
+skips their per-call validation entirely. Works for single rows and batches
+alike; with numba installed the traversal compiles to parallel native code.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # numba is optional; plain Python keeps the module importable
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        def wrap(fn):
+            return fn
+        return wrap
+
+
+def load_forest(path):
+    """Load the flat node arrays written by scripts/export_forest.py.
+
+    Returns a (feature, threshold, left, right, proba, offsets) tuple where
+    the first five arrays hold all trees' nodes concatenated and offsets[t]
+    is the index of tree t's root (offsets has n_trees + 1 entries).
+    """
+    data = np.load(path)
+    return (data['feature'], data['threshold'], data['left'], data['right'],
+            data['proba'], data['offsets'])
+
+
+@njit(parallel=True, cache=True)
+def predict_proba(feature, threshold, left, right, proba, offsets, x):
+    """Violent-crime probability for every row of the (N, 16) float32 array x.
+
+    Child indices are local to each tree, so traversal adds the tree's base
+    offset on every hop. Rows are independent, hence the prange over rows.
+    """
+    n_rows = x.shape[0]
+    n_trees = offsets.shape[0] - 1
+    out = np.empty(n_rows, dtype=np.float32)
+    for r in prange(n_rows):
+        acc = 0.0
+        for t in range(n_trees):
+            base = offsets[t]
+            node = 0
+            while feature[base + node] >= 0:
+                if x[r, feature[base + node]] <= threshold[base + node]:
+                    node = left[base + node]
+                else:
+                    node = right[base + node]
+            acc += proba[base + node]
+        out[r] = acc / n_trees
+    return out
@@ -0,0 +1,65 @@
+"""One-off export of the trained Random Forest to raw node arrays.
+
+joblib.load pulls in the full sklearn runtime just to serve tree traversal.
+This script strips the model down to the arrays traversal actually reads and
+saves them as models/forest.npz, which app/forest.py walks without importing
+sklearn or joblib at all.
+
+Run once after training (Notebook 2):
+
+    python scripts/export_forest.py
+"""
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / 'models'
+JOBLIB_PATH = MODELS_DIR / 'crime_predictor_model.joblib'
+NPZ_PATH = MODELS_DIR / 'forest.npz'
+
+
+def main():
+    model = joblib.load(JOBLIB_PATH)
+
+    features, thresholds, lefts, rights, probas, sizes = [], [], [], [], [], []
+    for est in model.estimators_:
+        tree = est.tree_
+        features.append(tree.feature.astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float32))
+        lefts.append(tree.children_left.astype(np.int32))
+        rights.append(tree.children_right.astype(np.int32))
+        # Per-node violent-crime probability; only leaf entries are read.
+        counts = tree.value[:, 0, :]
+        denom = counts.sum(axis=1)
+        denom[denom == 0] = 1
+        probas.append((counts[:, 1] / denom).astype(np.float32))
+        sizes.append(tree.node_count)
+
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    np.savez(
+        NPZ_PATH,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        proba=np.concatenate(probas),
+        offsets=offsets,
+    )
+    print(f"Wrote {NPZ_PATH} ({NPZ_PATH.stat().st_size / 1e6:.1f} MB, {len(sizes)} trees)")
+
+    # Sanity-check the exported forest against sklearn on a dummy row.
+    import sys
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'app'))
+    import forest
+    x = np.zeros((1, model.n_features_in_), dtype=np.float32)
+    npz_proba = forest.predict_proba(*forest.load_forest(NPZ_PATH), x)[0]
+    skl_proba = model.predict_proba(x)[0][1]
+    print(f"npz proba={npz_proba:.6f}  sklearn proba={skl_proba:.6f}")
+
+
+if __name__ == '__main__':
+    main()